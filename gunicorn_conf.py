@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+# Gunicorn settings for the Recipes Chatbot API.
+#
+# WEB_CONCURRENCY overrides the worker count; the default is the usual
+# (2 x CPU) + 1. Setting PRELOAD_DATASET=1 also turns on --preload so the
+# master loads the recipe dataset once before forking and workers share it
+# read-only (see main.py).
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 * multiprocessing.cpu_count() + 1))
+timeout = 120  # Gemini round-trips can take a while
+preload_app = os.environ.get("PRELOAD_DATASET") == "1"
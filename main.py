@@ -1,28 +1,84 @@
+import asyncio
+import datetime
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import vertexai
-from vertexai.generative_models import GenerativeModel, Part, Tool, FunctionDeclaration
+from vertexai.generative_models import Content, GenerativeModel, Part, Tool, FunctionDeclaration
+from vertexai.preview import caching
 import pandas as pd
+import pyarrow.parquet as pq
 from google.cloud import storage
-import io # Required for downloading from GCS to a buffer
+from google.cloud.storage import transfer_manager
+import os
 import traceback # For detailed error logging
 import sys # For flushing stdout
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+import orjson
 
 # Import your recipe tools and the function to set the DataFrame
 import recipe_tools
+import response_cache
 
 # Configuration for GCS
 GCS_BUCKET_NAME = "recipes-chatbot-123" # Your bucket name
 GCS_BLOB_NAME = "cleaned_recipes.parquet" # Your file name in the bucket
+PARQUET_LOCAL_PATH = "/tmp/recipes.parquet"
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+DOWNLOAD_MAX_WORKERS = 8
+
+# The only columns the recipe tools actually read; everything else in the
+# parquet file is skipped at load time.
+RECIPE_COLUMNS = [
+    'Name', 'RecipeInstructions', 'Calories', 'RecipeCategory',
+    'RecipeIngredientParts', 'SodiumContent', 'Keywords', 'TotalTime',
+    'FatContent', 'ProteinContent', 'CarbohydrateContent',
+]
 
 # FastAPI app initialization
 PROJECT_ID = "recipes-chatbot-461113"
 LOCATION   = "europe-west2"
 MODEL_NAME = "gemini-1.5-flash-002" # Or your preferred Gemini model
 
-app = FastAPI(title="Vertex AI Recipes Chatbot")
+SYSTEM_PROMPT = (
+    "You are a friendly recipes assistant. You help users find recipes and "
+    "nutritional information from a large recipe dataset by calling the tools "
+    "provided. Prefer calling a tool over guessing; when a tool returns recipe "
+    "details, present them clearly and concisely to the user."
+)
+
+# How long each explicit context cache lives on Vertex, and how long before
+# expiry we create a replacement.
+CONTEXT_CACHE_TTL = datetime.timedelta(hours=1)
+CONTEXT_CACHE_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Allow more in-flight blocking calls (tool execution offload) per worker
+    # than anyio's default of 40.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 64
+    # Startup does blocking I/O (GCS download, parquet decode); run it in a
+    # thread so the event loop can keep serving e.g. health checks.
+    await asyncio.to_thread(startup_event, app)
+    refresh_task = asyncio.create_task(_context_cache_refresher(app))
+    try:
+        yield
+    finally:
+        refresh_task.cancel()
+
+
+# orjson serializes responses several times faster than the stdlib json
+# encoder, which matters for the long markdown answers Gemini can return.
+app = FastAPI(
+    title="Vertex AI Recipes Chatbot",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # --- Pydantic Models ---
 class UserQuery(BaseModel):
@@ -101,49 +157,124 @@ recipe_gemini_tools = Tool(function_declarations=[
     # Add other FunctionDeclaration objects here if you create more tools
 ])
 
-# --- FastAPI Event Handlers ---
-@app.on_event("startup")
-def startup_event():
+# Answer cache in front of the Gemini calls. Namespaced by model and tool
+# schema so changing either one invalidates previously cached answers.
+answer_cache = response_cache.ResponseCache(
+    namespace=f"{MODEL_NAME}|{recipe_gemini_tools.to_dict()}"
+)
+
+# --- Model / Context-Cache Setup ---
+def _create_context_cache():
+    """Creates a Vertex context cache holding the static preamble."""
+    return caching.CachedContent.create(
+        model_name=MODEL_NAME,
+        system_instruction=SYSTEM_PROMPT,
+        tools=[recipe_gemini_tools],
+        ttl=CONTEXT_CACHE_TTL,
+    )
+
+
+def _use_cached_content(app: FastAPI, cached):
+    """Points app.state at a model backed by the given context cache."""
+    app.state.cached_content_name = cached.name
+    app.state.model = GenerativeModel.from_cached_content(cached_content=cached)
+    # Tools live in the cached content; passing them again per request
+    # would be rejected by the API.
+    app.state.request_tools = None
+
+
+def _init_model(app: FastAPI):
+    """
+    Creates the GenerativeModel, backed by an explicit Vertex context cache
+    holding the static preamble (system prompt + tool declarations) so each
+    request doesn't resend and re-encode it. Falls back to a plain model if
+    cache creation fails (e.g. the preamble is below the minimum cacheable
+    token count for the model).
+    """
+    try:
+        cached = _create_context_cache()
+        _use_cached_content(app, cached)
+        print(f"Context cache created: {cached.name} (ttl={CONTEXT_CACHE_TTL})")
+    except Exception as e:
+        print(f"Context caching unavailable, using plain model: {e}")
+        app.state.cached_content_name = None
+        app.state.model = GenerativeModel(MODEL_NAME, system_instruction=SYSTEM_PROMPT)
+        app.state.request_tools = [recipe_gemini_tools]
+
+
+async def _context_cache_refresher(app: FastAPI):
+    """Re-creates the context cache shortly before its TTL expires."""
+    refresh_interval = (CONTEXT_CACHE_TTL - CONTEXT_CACHE_REFRESH_MARGIN).total_seconds()
+    while True:
+        await asyncio.sleep(refresh_interval)
+        if getattr(app.state, 'cached_content_name', None) is None:
+            continue
+        try:
+            # CachedContent.create is a blocking network round-trip, so run
+            # it off the event loop; only swap app.state once the new cache
+            # exists, so a failed refresh keeps the previous cache serving
+            # and is retried on the next cycle instead of downgrading to
+            # the plain model for the rest of the worker's life.
+            cached = await asyncio.to_thread(_create_context_cache)
+            _use_cached_content(app, cached)
+            print(f"Context cache refreshed: {cached.name}")
+        except Exception as e:
+            print(f"Context cache refresh failed, keeping previous cache: {e}")
+
+
+# --- Dataset Loading ---
+def load_dataset():
+    """Downloads the recipe parquet from GCS and hands it to recipe_tools."""
+    print(f"Attempting to load dataset from GCS: gs://{GCS_BUCKET_NAME}/{GCS_BLOB_NAME}")
+    storage_client = storage.Client(project=PROJECT_ID)
+    bucket = storage_client.bucket(GCS_BUCKET_NAME)
+    blob = bucket.blob(GCS_BLOB_NAME)
+
+    print(f"Downloading Parquet file to {PARQUET_LOCAL_PATH}...")
+    try:
+        # Parallel range requests saturate the link far better than one
+        # TCP stream, cutting cold-start time. Needs blob.size populated.
+        blob.reload()
+        transfer_manager.download_chunks_concurrently(
+            blob, PARQUET_LOCAL_PATH,
+            chunk_size=DOWNLOAD_CHUNK_SIZE, max_workers=DOWNLOAD_MAX_WORKERS,
+        )
+    except Exception as e:
+        print(f"Concurrent download failed ({e}); falling back to single-stream download.")
+        blob.download_to_filename(PARQUET_LOCAL_PATH)
+    print(f"Downloaded {os.path.getsize(PARQUET_LOCAL_PATH)} bytes.")
+
+    # Memory-mapped, multi-threaded pyarrow read of just the columns the
+    # tools use; to_pandas with ArrowDtype + self_destruct avoids copying
+    # the buffers again into numpy objects.
+    available = set(pq.ParquetFile(PARQUET_LOCAL_PATH).schema_arrow.names)
+    columns = [col for col in RECIPE_COLUMNS if col in available]
+    table = pq.read_table(
+        PARQUET_LOCAL_PATH, columns=columns, memory_map=True, use_threads=True
+    )
+    recipes_data = table.to_pandas(types_mapper=pd.ArrowDtype, self_destruct=True)
+    recipes_data.reset_index(drop=True, inplace=True)  # RangeIndex for cheap masking
+    print(f"Successfully loaded Parquet with pyarrow. Shape: {recipes_data.shape}")
+
+    recipe_tools.set_recipes_dataframe(recipes_data)
+    print(f"Dataset '{GCS_BLOB_NAME}' loaded successfully from GCS bucket '{GCS_BUCKET_NAME}'.")
+
+
+# --- Application Startup (called from the lifespan context manager) ---
+def startup_event(app: FastAPI):
     print("Application startup: Initializing Vertex AI and loading dataset...")
     try:
         vertexai.init(project=PROJECT_ID, location=LOCATION)
         # Initialize the generative model
-        app.state.model = GenerativeModel(MODEL_NAME)
+        _init_model(app)
         print(f"Vertex AI initialized with model: {MODEL_NAME}")
 
-        # Load dataset from GCS
-        print(f"Attempting to load dataset from GCS: gs://{GCS_BUCKET_NAME}/{GCS_BLOB_NAME}")
-        storage_client = storage.Client(project=PROJECT_ID)
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        blob = bucket.blob(GCS_BLOB_NAME)
-        
-        print("Downloading Parquet file as bytes...")
-        parquet_bytes = blob.download_as_bytes()
-        print(f"Downloaded {len(parquet_bytes)} bytes. Type: {type(parquet_bytes)}.")
-        if isinstance(parquet_bytes, bytes):
-            print(f"First 100 bytes: {parquet_bytes[:100]}")
-        
-        recipes_data = None
-        try:
-            print("Attempting to load Parquet with fastparquet engine...")
-            recipes_data = pd.read_parquet(io.BytesIO(parquet_bytes), engine='fastparquet')
-            print(f"Successfully loaded Parquet with fastparquet. Shape: {recipes_data.shape}")
-        except Exception as e_fp:
-            print(f"Failed to load with fastparquet: {e_fp}")
-            print("Traceback for fastparquet failure:")
-            traceback.print_exc()
-            try:
-                print("Attempting to load Parquet with default engine (pyarrow if available)...")
-                recipes_data = pd.read_parquet(io.BytesIO(parquet_bytes)) # Fallback to default
-                print(f"Successfully loaded Parquet with default engine. Shape: {recipes_data.shape}")
-            except Exception as e_default:
-                print(f"Failed to load with default engine as well: {e_default}")
-                print("Traceback for default engine failure:")
-                traceback.print_exc()
-                raise
-
-        recipe_tools.set_recipes_dataframe(recipes_data)
-        print(f"Dataset '{GCS_BLOB_NAME}' loaded successfully from GCS bucket '{GCS_BUCKET_NAME}'.")
+        if recipe_tools.recipes_df is None:
+            load_dataset()
+        else:
+            # Already loaded at import time (PRELOAD_DATASET): the gunicorn
+            # master built the frame before forking, so the workers share it.
+            print("Dataset already loaded before fork; skipping reload.")
 
     except Exception as e:
         print(f"CRITICAL ERROR during startup: {e}")
@@ -153,6 +284,15 @@ def startup_event():
         app.state.startup_error = str(e)
 
 
+def _run_tool(tool_name: str, tool_args: dict) -> str:
+    """Dispatches a Gemini function call to the matching recipe tool."""
+    if tool_name == "search_recipes_by_criteria_tool":
+        return recipe_tools.search_recipes_by_criteria_tool(**tool_args)
+    if tool_name == "get_nutritional_info_tool":
+        return recipe_tools.get_nutritional_info_tool(**tool_args)
+    return f"Unknown tool: {tool_name}. I can't process this request."
+
+
 # --- API Endpoints ---
 @app.post("/ask", response_model=ChatResponse)
 async def ask_question(query: UserQuery):
@@ -165,12 +305,20 @@ async def ask_question(query: UserQuery):
         raise HTTPException(status_code=503, detail="Model not initialized. Service unavailable.")
 
     print(f"Received query: {query.question}")
-    
+
+    cached_answer = answer_cache.get(query.question)
+    if cached_answer is not None:
+        print("Answer served from response cache.")
+        return ChatResponse(answer=cached_answer)
+
     try:
-        chat = app.state.model.start_chat()
-        response = chat.send_message(
-            query.question,
-            tools=[recipe_gemini_tools]
+        # Stateless generate_content calls instead of a ChatSession: no
+        # per-request chat construction, and the async call keeps the event
+        # loop free during the Gemini round-trip.
+        user_content = Content(role="user", parts=[Part.from_text(query.question)])
+        response = await app.state.model.generate_content_async(
+            [user_content],
+            tools=app.state.request_tools
         )
         print(f"Gemini initial response: {response.candidates[0].content.parts if response.candidates else 'No candidates'}")
 
@@ -197,35 +345,42 @@ async def ask_question(query: UserQuery):
             tool_args = {key: value for key, value in function_call.args.items()}
             print(f"Gemini wants to call tool: {tool_name} with args: {tool_args}")
 
-            if tool_name == "search_recipes_by_criteria_tool":
-                function_result_str = recipe_tools.search_recipes_by_criteria_tool(**tool_args)
-            elif tool_name == "get_nutritional_info_tool":
-                function_result_str = recipe_tools.get_nutritional_info_tool(**tool_args)
-            else:
-                function_result_str = f"Unknown tool: {tool_name}. I can't process this request."
-            
+            # Run the tool on the threadpool so dataset scans never stall the
+            # event loop.
+            function_result_str = await anyio.to_thread.run_sync(_run_tool, tool_name, tool_args)
+
             print(f"Tool {tool_name} executed. Result: {str(function_result_str)[:200]}...")
 
-            response = chat.send_message(
-                Part.from_function_response(
-                    name=tool_name,
-                    response={"content": function_result_str}
-                )
+            # Single follow-up completion carrying the whole exchange: the
+            # user turn, the model's function call, and the tool result.
+            response = await app.state.model.generate_content_async(
+                [
+                    user_content,
+                    response.candidates[0].content,
+                    Content(role="user", parts=[Part.from_function_response(
+                        name=tool_name,
+                        response={"content": function_result_str}
+                    )]),
+                ],
+                tools=app.state.request_tools
             )
             print(f"Gemini response after function call: {response.candidates[0].content.parts if response.candidates else 'No candidates'}")
             if response.candidates and response.candidates[0].content.parts and hasattr(response.candidates[0].content.parts[0], 'text'):
                 api_response_text = response.candidates[0].content.parts[0].text
+                answer_cache.put(query.question, api_response_text)
             else: # Handle case where response after function call might not have text (e.g. another function call, or empty)
                 api_response_text = "Tool executed. Waiting for next step or final response." # Or some other placeholder
                 print("Warning: No direct text part in Gemini's response after function execution.")
-        
+
         elif hasattr(first_part, 'text'): # No function call, just a text response from Gemini
             api_response_text = first_part.text
+            answer_cache.put(query.question, api_response_text)
         else:
             api_response_text = "I received a response, but it was not in the expected format (no function call or text)."
             print("Warning: Gemini response part had no function_call and no text.")
 
-
+        # Only real model text reaches the cache above; the placeholder
+        # branches are transient failures and must stay retryable.
         return ChatResponse(answer=api_response_text)
 
     except AttributeError as e:
@@ -248,17 +403,124 @@ async def ask_question(query: UserQuery):
         # --- END MODIFICATION ---
         raise HTTPException(status_code=500, detail=str(e))
 
-# --- Static File Serving (Keep as is from your original main.py) ---
-@app.get("/manifest.json", include_in_schema=False) # Added route for manifest.json
-async def manifest():
-    return FileResponse("frontend/build/manifest.json")
+def _sse_event(text: str) -> str:
+    """Formats one Server-Sent Event carrying a chunk of answer text."""
+    return f"data: {orjson.dumps({'t': text}).decode()}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(query: UserQuery):
+    """
+    Streaming variant of /ask: forwards answer text over Server-Sent Events
+    as Gemini generates it, so the client can render tokens immediately
+    instead of waiting for the full response. The tool-detection call stays
+    non-streaming; the final answer (post-tool, if any) is streamed.
+    """
+    if hasattr(app.state, 'startup_error') and app.state.startup_error:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service unavailable due to startup error: {app.state.startup_error}"
+        )
+    if not app.state.model:
+        raise HTTPException(status_code=503, detail="Model not initialized. Service unavailable.")
+
+    print(f"Received streaming query: {query.question}")
+
+    async def event_stream():
+        cached_answer = answer_cache.get(query.question)
+        if cached_answer is not None:
+            print("Streamed answer served from response cache.")
+            yield _sse_event(cached_answer)
+            return
+
+        try:
+            user_content = Content(role="user", parts=[Part.from_text(query.question)])
+            response = await app.state.model.generate_content_async(
+                [user_content],
+                tools=app.state.request_tools
+            )
+
+            if not response.candidates or not response.candidates[0].content.parts:
+                yield _sse_event("I could not retrieve an answer. Please try rephrasing your question.")
+                return
+
+            first_part = response.candidates[0].content.parts[0]
+            collected: list[str] = []
+
+            if hasattr(first_part, 'function_call') and first_part.function_call and first_part.function_call.name:
+                function_call = first_part.function_call
+                tool_name = function_call.name
+                tool_args = {key: value for key, value in function_call.args.items()}
+                print(f"Gemini wants to call tool: {tool_name} with args: {tool_args}")
+
+                function_result_str = await anyio.to_thread.run_sync(_run_tool, tool_name, tool_args)
+
+                final_stream = await app.state.model.generate_content_async(
+                    [
+                        user_content,
+                        response.candidates[0].content,
+                        Content(role="user", parts=[Part.from_function_response(
+                            name=tool_name,
+                            response={"content": function_result_str}
+                        )]),
+                    ],
+                    tools=app.state.request_tools,
+                    stream=True
+                )
+                async for chunk in final_stream:
+                    try:
+                        chunk_text = chunk.text
+                    except (AttributeError, ValueError):
+                        continue
+                    if chunk_text:
+                        collected.append(chunk_text)
+                        yield _sse_event(chunk_text)
+            elif hasattr(first_part, 'text') and first_part.text:
+                collected.append(first_part.text)
+                yield _sse_event(first_part.text)
+            else:
+                yield _sse_event("I received a response, but it was not in the expected format (no function call or text).")
+                return
+
+            if collected:
+                answer_cache.put(query.question, "".join(collected))
+
+        except Exception as e:
+            print(f"Error in /ask/stream endpoint: {e}")
+            traceback.print_exc()
+            yield _sse_event("Sorry, an error occurred while generating the answer.")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# Optionally load the dataset at import time. With gunicorn --preload and
+# PRELOAD_DATASET=1 the master process builds the frame and search indexes
+# once before forking, so all workers share those pages read-only instead of
+# each re-downloading and re-building them.
+if os.environ.get("PRELOAD_DATASET") == "1":
+    try:
+        load_dataset()
+    except Exception as e:
+        print(f"Dataset preload failed; workers will load it on startup: {e}")
+        traceback.print_exc()
+
+
+# --- Static File Serving ---
+# Serving the React bundle from uvicorn competes with /ask for the event
+# loop. Preferred deployment puts nginx (deploy/nginx.conf) or a CDN in front
+# of the API and sets SERVE_STATIC=0 so the Python process only handles /ask;
+# the in-process routes stay as the default for single-container deploys.
+if os.environ.get("SERVE_STATIC", "1") != "0":
+    @app.get("/manifest.json", include_in_schema=False) # Added route for manifest.json
+    async def manifest():
+        return FileResponse("frontend/build/manifest.json")
 
-@app.get("/", include_in_schema=False)
-async def root():
-    return FileResponse("frontend/build/index.html")
+    @app.get("/", include_in_schema=False)
+    async def root():
+        return FileResponse("frontend/build/index.html")
 
-app.mount(
-    "/static",
-    StaticFiles(directory="frontend/build/static"),
-    name="react-static-assets"
-)
\ No newline at end of file
+    app.mount(
+        "/static",
+        StaticFiles(directory="frontend/build/static"),
+        name="react-static-assets"
+    )
\ No newline at end of file
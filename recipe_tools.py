@@ -1,92 +1,369 @@
+import logging
+import re
+from functools import lru_cache
+
 import pandas as pd
-import traceback
-# import numpy as np # Not strictly needed for the fix unless using np.ndarray explicitly elsewhere
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+log = logging.getLogger(__name__)
+
+# The dataset is shared read-only; Copy-on-Write guarantees no hidden
+# defensive copies. pandas >= 3.0 always runs CoW and deprecates the option,
+# so ignore the setting failing or warning there.
+try:
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pd.options.mode.copy_on_write = True
+except (AttributeError, KeyError):
+    pass
 
 # This global DataFrame will be populated by main.py on application startup
 recipes_df: pd.DataFrame | None = None
 
+# Inverted indexes built at startup: normalized token -> boolean bitmap of the
+# rows whose RecipeIngredientParts / Keywords contain that token. Query-time
+# ingredient AND becomes a bitmap AND instead of a substring scan over all rows.
+_ingredient_index: dict[str, np.ndarray] = {}
+_keyword_index: dict[str, np.ndarray] = {}
+
+# Arrow-backed copies of the list columns, lowercased once at startup.
+# Substring predicates over them run as pyarrow.compute kernels (C++ over
+# contiguous buffers) instead of per-row Python iteration.
+_ingredients_arrow: pa.Array | None = None
+_keywords_arrow: pa.Array | None = None
+
+# Lowercased Arrow string copies of Name/RecipeCategory, so name and category
+# predicates are plain C substring scans (no regex compiled from user input).
+_name_arrow: pa.Array | None = None
+_category_arrow: pa.Array | None = None
+
+# Exact lowercased name -> row id, for O(1) recipe lookups by full name.
+_name_exact: dict[str, int] = {}
+
+# Numeric filter columns cached once as contiguous float32 arrays so each
+# predicate is a single vectorized compare, with no per-request coercion or
+# index-aligned Series allocation.
+_CAL: np.ndarray | None = None
+_SOD: np.ndarray | None = None
+_TIME: np.ndarray | None = None
+
+# Per-row display blocks (the markdown format_results_for_gemini would emit
+# for each single recipe), rendered once at startup so formatting a result
+# page is just joining k precomputed strings.
+_display_blocks: list[str] | None = None
+
+_DISPLAY_COLUMNS = [
+    'Name', 'RecipeInstructions', 'Calories', 'RecipeCategory',
+    'RecipeIngredientParts', 'SodiumContent', 'Keywords', 'TotalTime'
+]
+
+_TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+
+
+def _build_inverted_index(values, n_rows: int) -> dict[str, np.ndarray]:
+    """
+    Builds token -> row-bitmap from a list-typed column (one pass over rows).
+    """
+    index: dict[str, np.ndarray] = {}
+    for i, parts in enumerate(values):
+        parts = _as_list(parts)
+        if parts is None:
+            continue
+        for item in parts:
+            if item is None:
+                continue
+            for token in _TOKEN_SPLIT.split(str(item).lower()):
+                if not token:
+                    continue
+                bitmap = index.get(token)
+                if bitmap is None:
+                    bitmap = np.zeros(n_rows, dtype=bool)
+                    index[token] = bitmap
+                bitmap[i] = True
+    return index
+
+
+def _to_arrow_list_array(series: pd.Series) -> pa.Array | None:
+    """
+    Converts a list-typed column to a lowercased Arrow large_list<large_string>
+    array for use with pyarrow.compute kernels. Returns None if the column
+    cannot be represented that way.
+    """
+    def _lowered_lists():
+        for value in series:
+            parts = _as_list(value)
+            if parts is None:
+                yield None
+            else:
+                yield [str(item).lower() for item in parts if item is not None]
+
+    try:
+        return pa.array(_lowered_lists(), type=pa.large_list(pa.large_string()))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+        print(f"Could not build Arrow list array for '{series.name}': {e}")
+        return None
+
+
+def _to_arrow_lower_string(series: pd.Series) -> pa.Array | None:
+    """
+    Converts a string column to a lowercased Arrow large_string array (nulls
+    preserved). Returns None if the column cannot be represented that way.
+    """
+    try:
+        return pc.utf8_lower(pa.array(series, type=pa.large_string(), from_pandas=True))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+        print(f"Could not build Arrow string array for '{series.name}': {e}")
+        return None
+
+
+def _contains_string(string_arr: pa.Array, needle: str) -> np.ndarray:
+    """Boolean mask of the rows whose string contains `needle` (nulls -> False)."""
+    hits = pc.fill_null(pc.match_substring(string_arr, needle), False)
+    return hits.to_numpy(zero_copy_only=False).astype(bool, copy=False)
+
+
+def _contains_per_row(list_arr: pa.Array, needle: str, n_rows: int) -> np.ndarray:
+    """
+    Returns a boolean mask of the rows whose list column contains `needle` as
+    a substring of at least one item. Runs entirely in pyarrow.compute.
+    """
+    flat = pc.list_flatten(list_arr)
+    parents = pc.list_parent_indices(list_arr)
+    hits = pc.match_substring(flat, needle)
+    hit_parents = pc.filter(parents, hits).to_numpy(zero_copy_only=False)
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[hit_parents] = True
+    return mask
+
+
+def _lookup_bitmap(index: dict[str, np.ndarray], query: str) -> np.ndarray | None:
+    """
+    Resolves a normalized query against an inverted index.
+
+    Exact token hits are O(1). Otherwise OR together the bitmaps of every
+    indexed token containing the query as a substring (e.g. 'chick' matching
+    'chicken'), which scans index keys rather than dataset rows. Returns None
+    when the index cannot answer the query -- the index is empty, or the query
+    spans a token boundary (e.g. 'half-and-half': keys are split on
+    non-alphanumerics, so such a query can never be a substring of any key) --
+    and the caller falls back to a substring scan over the rows.
+    """
+    if not index:
+        return None
+    bitmap = index.get(query)
+    if bitmap is not None:
+        return bitmap
+    partial_hits = [bm for key, bm in index.items() if query in key]
+    if partial_hits:
+        return np.logical_or.reduce(partial_hits)
+    if _TOKEN_SPLIT.search(query):
+        return None
+    # A purely alphanumeric substring of an item always lies within a single
+    # token, so a miss here is a genuine miss.
+    return np.zeros(len(next(iter(index.values()))), dtype=bool)
+
+# Separator used when joining list-typed columns into one searchable string per
+# row. A control character so ingredient substrings can never match across the
+# boundary between two list items.
+_JOIN_SEP = "\x1f"
+
+
+def _as_list(value) -> list | None:
+    """
+    Normalizes a list-typed cell to a Python list. Arrow-backed frames hand
+    cells back as numpy arrays (or pd.NA) depending on the access path.
+    """
+    if isinstance(value, list):
+        return value
+    if isinstance(value, (np.ndarray, tuple)):
+        return list(value)
+    return None
+
+
+def _join_lowered(parts) -> str:
+    """Joins a list column value into a single lowercased search string."""
+    parts = _as_list(parts)
+    if parts is not None:
+        return _JOIN_SEP.join(str(item).lower() for item in parts if item is not None)
+    return ""
+
+
+def _build_search_columns(df: pd.DataFrame):
+    """
+    Precomputes auxiliary lowercased/numeric columns used by the search tools.
+
+    The dataset is loaded once at startup and never mutated afterwards, so we
+    pay the per-row Python work here instead of on every request. Query-time
+    filters then run as vectorized `.str.contains(..., regex=False)` /
+    numpy comparisons over these columns.
+    """
+    if 'RecipeIngredientParts' in df.columns:
+        df['_ingredients_joined'] = df['RecipeIngredientParts'].map(_join_lowered)
+    if 'Keywords' in df.columns:
+        df['_keywords_joined'] = df['Keywords'].map(_join_lowered)
+    if 'Name' in df.columns:
+        df['_name_lower'] = df['Name'].astype(str).str.lower()
+
+    # Numeric filter columns, coerced once to contiguous float32 arrays so
+    # per-request filtering is a single vectorized compare (NaN compares
+    # False, which is the behaviour we want).
+    global _CAL, _SOD, _TIME
+    _CAL = _to_float32(df, 'Calories')
+    _SOD = _to_float32(df, 'SodiumContent')
+    _TIME = _to_float32(df, 'TotalTime')
+
+
+def _to_float32(df: pd.DataFrame, source_col: str) -> np.ndarray | None:
+    if source_col not in df.columns:
+        return None
+    arr = np.ascontiguousarray(
+        pd.to_numeric(df[source_col], errors='coerce').to_numpy(dtype='float32', na_value=np.nan)
+    )
+    arr.setflags(write=False)  # shared across workers; never written after startup
+    return arr
+
+
+def _le_mask(arr: np.ndarray, limit) -> np.ndarray:
+    """arr <= limit with NaN treated as False, without tripping RuntimeWarnings."""
+    return np.less_equal(arr, limit, where=~np.isnan(arr), out=np.zeros(arr.shape, dtype=bool))
+
+
 def set_recipes_dataframe(df: pd.DataFrame):
     """
     This function will be called from main.py once the DataFrame is loaded from GCS.
     """
-    global recipes_df
+    global recipes_df, _ingredient_index, _keyword_index
+    global _ingredients_arrow, _keywords_arrow, _name_arrow, _category_arrow
+    global _CAL, _SOD, _TIME, _display_blocks, _name_exact
     recipes_df = df
+    _ingredient_index = {}
+    _keyword_index = {}
+    _ingredients_arrow = None
+    _keywords_arrow = None
+    _name_arrow = None
+    _category_arrow = None
+    _CAL = _SOD = _TIME = None
+    _display_blocks = None
+    _name_exact = {}
+    _nutritional_info.cache_clear()
     if recipes_df is not None and not recipes_df.empty:
+        _build_search_columns(recipes_df)
+        if 'RecipeIngredientParts' in recipes_df.columns:
+            _ingredient_index = _build_inverted_index(
+                recipes_df['RecipeIngredientParts'].tolist(), len(recipes_df)
+            )
+            _ingredients_arrow = _to_arrow_list_array(recipes_df['RecipeIngredientParts'])
+        if 'Keywords' in recipes_df.columns:
+            _keyword_index = _build_inverted_index(
+                recipes_df['Keywords'].tolist(), len(recipes_df)
+            )
+            _keywords_arrow = _to_arrow_list_array(recipes_df['Keywords'])
+        if 'Name' in recipes_df.columns:
+            _name_arrow = _to_arrow_lower_string(recipes_df['Name'])
+            for i, name in enumerate(recipes_df['Name'].tolist()):
+                if name is not None and pd.notna(name):
+                    _name_exact.setdefault(str(name).lower(), i)
+        if 'RecipeCategory' in recipes_df.columns:
+            _category_arrow = _to_arrow_lower_string(recipes_df['RecipeCategory'])
+        _display_blocks = _build_display_blocks(recipes_df)
         print(f"Recipe DataFrame successfully loaded into recipe_tools. Shape: {recipes_df.shape}")
     elif recipes_df is not None and recipes_df.empty:
         print(f"Recipe DataFrame initialized as EMPTY in recipe_tools. Shape: {recipes_df.shape}. This might be due to a loading error upstream.")
     else:
         print("Failed to initialize DataFrame in recipe_tools (it's None).")
 
-def format_results_for_gemini(filtered_df: pd.DataFrame, max_results: int = 3) -> str:
+def format_results_for_gemini(filtered_df: pd.DataFrame, max_results: int = 3, total_matches: int | None = None) -> str:
     """
     Formats a DataFrame of recipes into a string suitable for Gemini.
+
+    `filtered_df` may already be truncated to the rows that will be shown;
+    pass `total_matches` so the "and N more" footer reflects the full match
+    count without materializing the whole filtered frame.
     """
     if filtered_df.empty:
         return "No recipes found matching your criteria."
 
+    if total_matches is None:
+        total_matches = len(filtered_df)
+
     output_parts = ["Here are some recipes I found:"]
-    
-    display_columns = [
-        'Name', 'RecipeInstructions', 'Calories', 'RecipeCategory', 
-        'RecipeIngredientParts', 'SodiumContent', 'Keywords', 'TotalTime'
-    ]
+
     # Ensure we only try to access columns that actually exist in the filtered_df
-    available_columns = [col for col in display_columns if col in filtered_df.columns]
-
-    for index, row in filtered_df[available_columns].head(max_results).iterrows():
-        recipe_detail = f"\n### {row.get('Name', 'N/A')}" 
-        
-        if 'RecipeCategory' in row and pd.notna(row['RecipeCategory']):
-            recipe_detail += f"\n*Category:* {row['RecipeCategory']}"
-        
-        if 'Calories' in row and pd.notna(row['Calories']):
-            recipe_detail += f"\n*Calories:* {row.get('Calories')}"
-
-        if 'SodiumContent' in row and pd.notna(row['SodiumContent']):
-            recipe_detail += f"\n*Sodium:* {row.get('SodiumContent')} mg"
-
-        if 'TotalTime' in row and pd.notna(row['TotalTime']):
-            recipe_detail += f"\n*Cook Time:* {row.get('TotalTime')} minutes"
-
-        if 'Keywords' in row and isinstance(row['Keywords'], list) and row['Keywords']:
-            keywords_str = [str(kw) for kw in row['Keywords'][:3]]
-            recipe_detail += f"\n*Cuisine/Keywords:* {', '.join(keywords_str)}{'...' if len(row['Keywords']) > 3 else ''}"
-
-        if 'RecipeIngredientParts' in row and isinstance(row['RecipeIngredientParts'], list) and row['RecipeIngredientParts']:
-            key_ingredients = [str(ing) for ing in row['RecipeIngredientParts'][:5]] 
-            recipe_detail += f"\n*Key Ingredients:* {', '.join(key_ingredients)}{'...' if len(row['RecipeIngredientParts']) > 5 else ''}"
-
-        # --- MODIFIED SECTION for RecipeInstructions ---
-        if 'RecipeInstructions' in row: # Check if column exists in the row's available columns
-            instructions_value = row.get('RecipeInstructions')
-            is_instructions_present = False
-            if instructions_value is not None:
-                # Check if it's a list, Pandas Series, or Pandas specific array type
-                if isinstance(instructions_value, (list, pd.Series, pd.arrays.PandasArray)):
-                    if isinstance(instructions_value, list):
-                        # For a Python list, consider it present if it's not empty
-                        is_instructions_present = bool(instructions_value)
-                    else:
-                        # For Pandas Series or PandasArray, consider it present if any element is not NA
-                        # This requires converting to Series if it's a PandasArray for .notna().any()
-                        is_instructions_present = pd.Series(instructions_value).notna().any()
-                else:
-                    # For scalar values (string, number, bool, etc.)
-                    is_instructions_present = pd.notna(instructions_value)
-            
-            if is_instructions_present:
-                instructions = str(instructions_value) # Convert to string (handles lists becoming "['Step1', 'Step2']")
-                recipe_detail += f"\n*Instructions:* {instructions[:200] + '...' if len(instructions) > 200 else instructions}"
-        # --- END MODIFIED SECTION ---
-        
-        output_parts.append(recipe_detail)
-    
-    if len(filtered_df) > max_results:
-        output_parts.append(f"\n...and {len(filtered_df) - max_results} more similar recipes found.")
-        
+    available_columns = [col for col in _DISPLAY_COLUMNS if col in filtered_df.columns]
+
+    # Narrow to the shown rows/columns once, then work with plain dicts;
+    # each recipe is built as a list of lines joined once at the end instead
+    # of repeated string concatenation and row.get() lookups.
+    records = filtered_df.iloc[:max_results][available_columns].to_dict(orient='records')
+    for record in records:
+        output_parts.append(_format_recipe_block(record))
+
+    if total_matches > max_results:
+        output_parts.append(f"\n...and {total_matches - max_results} more similar recipes found.")
+
     return "\n".join(output_parts)
 
+
+def _format_recipe_block(record: dict) -> str:
+    """Renders the markdown block for a single recipe record."""
+    chunks = [f"\n### {record.get('Name', 'N/A')}"]
+
+    category = record.get('RecipeCategory')
+    if category is not None and pd.notna(category):
+        chunks.append(f"*Category:* {category}")
+
+    calories = record.get('Calories')
+    if calories is not None and pd.notna(calories):
+        chunks.append(f"*Calories:* {calories}")
+
+    sodium = record.get('SodiumContent')
+    if sodium is not None and pd.notna(sodium):
+        chunks.append(f"*Sodium:* {sodium} mg")
+
+    total_time = record.get('TotalTime')
+    if total_time is not None and pd.notna(total_time):
+        chunks.append(f"*Cook Time:* {total_time} minutes")
+
+    keywords = _as_list(record.get('Keywords'))
+    if keywords:
+        keywords_str = [str(kw) for kw in keywords[:3]]
+        chunks.append(f"*Cuisine/Keywords:* {', '.join(keywords_str)}{'...' if len(keywords) > 3 else ''}")
+
+    ingredient_parts = _as_list(record.get('RecipeIngredientParts'))
+    if ingredient_parts:
+        key_ingredients = [str(ing) for ing in ingredient_parts[:5]]
+        chunks.append(f"*Key Ingredients:* {', '.join(key_ingredients)}{'...' if len(ingredient_parts) > 5 else ''}")
+
+    instructions_value = record.get('RecipeInstructions')
+    instructions_list = _as_list(instructions_value)
+    if instructions_list is not None:
+        instructions_value = instructions_list
+        has_instructions = any(pd.notna(item) for item in instructions_list)
+    else:
+        has_instructions = instructions_value is not None and pd.notna(instructions_value)
+    if has_instructions:
+        instructions = str(instructions_value)
+        chunks.append(f"*Instructions:* {instructions[:200] + '...' if len(instructions) > 200 else instructions}")
+
+    return "\n".join(chunks)
+
+
+def _build_display_blocks(df: pd.DataFrame) -> list[str]:
+    """
+    Pre-renders every recipe's display block. Done in slices so the transient
+    record dicts never cover more than a small window of the frame.
+    """
+    available_columns = [col for col in _DISPLAY_COLUMNS if col in df.columns]
+    blocks: list[str] = []
+    chunk_size = 50_000
+    for start in range(0, len(df), chunk_size):
+        records = df.iloc[start:start + chunk_size][available_columns].to_dict(orient='records')
+        blocks.extend(_format_recipe_block(record) for record in records)
+    return blocks
+
 # --- Main Search Tool ---
 
 def search_recipes_by_criteria_tool(
@@ -95,134 +372,156 @@ def search_recipes_by_criteria_tool(
     max_calories: int | None = None,
     max_sodium: int | None = None, 
     cuisine: str | None = None,    
-    max_cook_time: int | None = None, 
-    recipe_name: str | None = None
+    max_cook_time: int | None = None,
+    recipe_name: str | None = None,
+    max_results: int = 3
 ) -> str:
     if recipes_df is None:
         return "I'm sorry, the recipe dataset is not available at the moment. Please try again later."
 
-    filtered_df = recipes_df.copy()
+    # One outer error boundary; the schema is validated and the search
+    # structures are built once at startup, so the predicates themselves run
+    # as straight-line vectorized code with no per-predicate try/except.
+    try:
+        return _search_recipes(
+            ingredients=ingredients, category=category, max_calories=max_calories,
+            max_sodium=max_sodium, cuisine=cuisine, max_cook_time=max_cook_time,
+            recipe_name=recipe_name, max_results=max_results,
+        )
+    except Exception:
+        log.exception("Unexpected error during recipe search")
+        return "An error occurred while searching for recipes."
+
+
+def _search_recipes(
+    ingredients: list[str] | None,
+    category: str | None,
+    max_calories: int | None,
+    max_sodium: int | None,
+    cuisine: str | None,
+    max_cook_time: int | None,
+    recipe_name: str | None,
+    max_results: int,
+) -> str:
+    # A single boolean mask over the whole frame; each predicate ANDs into it
+    # and rows are materialized exactly once at the end. This avoids the old
+    # recipes_df.copy() plus one new frame allocation per predicate.
+    mask = np.ones(len(recipes_df), dtype=bool)
     applied_filters = False
 
     def _check_column(df, col_name, filter_name):
         if col_name not in df.columns:
-            print(f"Warning: Column '{col_name}' not found for '{filter_name}' filter.")
+            log.warning("Column '%s' not found for '%s' filter.", col_name, filter_name)
             return False
         return True
 
     if ingredients and isinstance(ingredients, list) and len(ingredients) > 0:
         applied_filters = True
-        if not _check_column(filtered_df, 'RecipeIngredientParts', 'ingredients'):
+        if not _check_column(recipes_df, '_ingredients_joined', 'ingredients'):
             return "Cannot search by ingredients: 'RecipeIngredientParts' column is missing."
-        try:
-            ingredients_lower = [ing.lower() for ing in ingredients]
-            # Ensure 'parts' is treated as a list and items within 'parts' are strings for robust searching
-            condition = filtered_df['RecipeIngredientParts'].apply(
-                lambda parts: isinstance(parts, list) and \
-                              all(any(ing_search in str(item).lower() for item in parts if item is not None) for ing_search in ingredients_lower)
-            )
-            filtered_df = filtered_df[condition]
-        except Exception as e:
-            print(f"Error during ingredients filtering: {e}")
-            traceback.print_exc() # Add traceback for debugging filter errors
-            return f"An error occurred while searching by ingredients."
-        if filtered_df.empty: return f"No recipes found containing all ingredients: {', '.join(ingredients)}."
-    
+        # AND the ingredients together. Single-word queries resolve against
+        # the inverted index (bitmap AND); multi-word queries fall back to
+        # a substring scan over the precomputed joined column.
+        for ing in ingredients:
+            ing_norm = str(ing).lower().strip()
+            bitmap = _lookup_bitmap(_ingredient_index, ing_norm) if ' ' not in ing_norm else None
+            if bitmap is not None:
+                mask &= bitmap
+            elif _ingredients_arrow is not None:
+                mask &= _contains_per_row(_ingredients_arrow, ing_norm, len(recipes_df))
+            else:
+                mask &= recipes_df['_ingredients_joined'].str.contains(
+                    ing_norm, regex=False, na=False
+                ).to_numpy()
+        if not mask.any(): return f"No recipes found containing all ingredients: {', '.join(ingredients)}."
+
     if recipe_name:
         applied_filters = True
-        if not _check_column(filtered_df, 'Name', 'recipe name'):
+        if not _check_column(recipes_df, '_name_lower', 'recipe name'):
             return "Cannot search by name: 'Name' column is missing."
-        try:
-            filtered_df = filtered_df[filtered_df['Name'].str.contains(recipe_name, case=False, na=False)]
-        except Exception as e:
-            print(f"Error during recipe name filtering: {e}")
-            traceback.print_exc()
-            return f"An error occurred while searching by recipe name."
-        if filtered_df.empty: return f"No recipes found with the name/keyword: {recipe_name} (after other filters)."
+        name_needle = recipe_name.lower()
+        if _name_arrow is not None:
+            mask &= _contains_string(_name_arrow, name_needle)
+        else:
+            mask &= recipes_df['_name_lower'].str.contains(
+                name_needle, regex=False, na=False
+            ).to_numpy()
+        if not mask.any(): return f"No recipes found with the name/keyword: {recipe_name} (after other filters)."
 
     if category:
         applied_filters = True
-        if not _check_column(filtered_df, 'RecipeCategory', 'category'):
+        if not _check_column(recipes_df, 'RecipeCategory', 'category'):
             return "Cannot search by category: 'RecipeCategory' column is missing."
-        try:
-            filtered_df = filtered_df[filtered_df['RecipeCategory'].str.contains(category, case=False, na=False)]
-        except Exception as e:
-            print(f"Error during category filtering: {e}")
-            traceback.print_exc()
-            return f"An error occurred while searching by category."
-        if filtered_df.empty: return f"No recipes found in category: {category} (after other filters)."
+        category_needle = category.lower()
+        if _category_arrow is not None:
+            mask &= _contains_string(_category_arrow, category_needle)
+        else:
+            mask &= recipes_df['RecipeCategory'].str.contains(
+                category_needle, case=False, na=False, regex=False
+            ).to_numpy()
+        if not mask.any(): return f"No recipes found in category: {category} (after other filters)."
 
     if max_calories is not None:
         applied_filters = True
-        if not _check_column(filtered_df, 'Calories', 'max calories'):
+        if _CAL is None:
+            log.warning("Column 'Calories' not found for 'max calories' filter.")
             return "Cannot filter by calories: 'Calories' column is missing."
-        try:
-            calories_numeric = pd.to_numeric(filtered_df['Calories'], errors='coerce')
-            # Create a boolean Series for filtering, ensuring same index as filtered_df
-            condition = pd.Series(False, index=filtered_df.index)
-            valid_calories = calories_numeric.notna()
-            condition[valid_calories] = calories_numeric[valid_calories] <= max_calories
-            filtered_df = filtered_df[condition]
-
-        except Exception as e:
-            print(f"Error during calorie filtering: {e}")
-            traceback.print_exc()
-            return f"An error occurred while filtering by calories."
-        if filtered_df.empty: return f"No recipes found under {max_calories} calories (after other filters)."
+        # NaN values compare False here, so rows with missing calories are
+        # dropped, matching the previous behaviour.
+        mask &= _le_mask(_CAL, max_calories)
+        if not mask.any(): return f"No recipes found under {max_calories} calories (after other filters)."
 
     if max_sodium is not None:
         applied_filters = True
-        if not _check_column(filtered_df, 'SodiumContent', 'max sodium'):
+        if _SOD is None:
+            log.warning("Column 'SodiumContent' not found for 'max sodium' filter.")
             return "Cannot filter by sodium: 'SodiumContent' column is missing."
-        try:
-            sodium_numeric = pd.to_numeric(filtered_df['SodiumContent'], errors='coerce')
-            condition = pd.Series(False, index=filtered_df.index)
-            valid_sodium = sodium_numeric.notna()
-            condition[valid_sodium] = sodium_numeric[valid_sodium] <= max_sodium
-            filtered_df = filtered_df[condition]
-        except Exception as e:
-            print(f"Error during sodium filtering: {e}")
-            traceback.print_exc()
-            return f"An error occurred while filtering by sodium content."
-        if filtered_df.empty: return f"No recipes found under {max_sodium}mg sodium (after other filters)."
+        mask &= _le_mask(_SOD, max_sodium)
+        if not mask.any(): return f"No recipes found under {max_sodium}mg sodium (after other filters)."
 
     if cuisine:
         applied_filters = True
-        if not _check_column(filtered_df, 'Keywords', 'cuisine/keywords'):
+        if not _check_column(recipes_df, '_keywords_joined', 'cuisine/keywords'):
             return "Cannot search by cuisine: 'Keywords' column is missing."
-        try:
-            cuisine_lower = cuisine.lower()
-            condition = filtered_df['Keywords'].apply(
-                lambda kws: isinstance(kws, list) and \
-                            any(cuisine_lower in str(kw).lower() for kw in kws if kw is not None)
-            )
-            filtered_df = filtered_df[condition]
-        except Exception as e:
-            print(f"Error during cuisine/keywords filtering: {e}")
-            traceback.print_exc()
-            return f"An error occurred while searching by cuisine."
-        if filtered_df.empty: return f"No recipes found for cuisine/keyword: {cuisine} (after other filters)."
+        cuisine_norm = cuisine.lower().strip()
+        bitmap = _lookup_bitmap(_keyword_index, cuisine_norm) if ' ' not in cuisine_norm else None
+        if bitmap is not None:
+            mask &= bitmap
+        elif _keywords_arrow is not None:
+            mask &= _contains_per_row(_keywords_arrow, cuisine_norm, len(recipes_df))
+        else:
+            mask &= recipes_df['_keywords_joined'].str.contains(
+                cuisine_norm, regex=False, na=False
+            ).to_numpy()
+        if not mask.any(): return f"No recipes found for cuisine/keyword: {cuisine} (after other filters)."
 
     if max_cook_time is not None:
         applied_filters = True
-        if not _check_column(filtered_df, 'TotalTime', 'max cook time'):
+        if _TIME is None:
+            log.warning("Column 'TotalTime' not found for 'max cook time' filter.")
             return "Cannot filter by cook time: 'TotalTime' column is missing."
-        try:
-            cook_time_numeric = pd.to_numeric(filtered_df['TotalTime'], errors='coerce')
-            condition = pd.Series(False, index=filtered_df.index)
-            valid_cook_time = cook_time_numeric.notna()
-            condition[valid_cook_time] = cook_time_numeric[valid_cook_time] <= max_cook_time
-            filtered_df = filtered_df[condition]
-        except Exception as e:
-            print(f"Error during cook time filtering: {e}")
-            traceback.print_exc()
-            return f"An error occurred while filtering by cook time."
-        if filtered_df.empty: return f"No recipes found with cook time under {max_cook_time} minutes (after other filters)."
-    
+        mask &= _le_mask(_TIME, max_cook_time)
+        if not mask.any(): return f"No recipes found with cook time under {max_cook_time} minutes (after other filters)."
+
     if not applied_filters:
         return "Please provide some criteria to search for recipes (e.g., ingredients, category, name, max calories, cuisine, max cook time, max sodium)."
-            
-    return format_results_for_gemini(filtered_df)
+
+    total = int(np.count_nonzero(mask))
+    if total == 0:
+        return "No recipes found matching your criteria."
+    idx = np.flatnonzero(mask)[:max_results]
+    if _display_blocks is not None:
+        # Result pages are joins of blocks pre-rendered at startup.
+        output_parts = ["Here are some recipes I found:"]
+        output_parts.extend(_display_blocks[i] for i in idx)
+        if total > max_results:
+            output_parts.append(f"\n...and {total - max_results} more similar recipes found.")
+        return "\n".join(output_parts)
+    # Fallback: only the rows that will actually be shown are materialized;
+    # the footer count comes from the mask popcount, not the filtered frame.
+    return format_results_for_gemini(
+        recipes_df.iloc[idx], max_results=max_results, total_matches=total
+    )
 
 
 def get_nutritional_info_tool(recipe_name: str) -> str:
@@ -230,29 +529,43 @@ def get_nutritional_info_tool(recipe_name: str) -> str:
         return "I'm sorry, the recipe dataset is not available at the moment."
 
     try:
-        if 'Name' not in recipes_df.columns:
-            return "Information unavailable: 'Name' column missing."
-        
-        match = recipes_df[recipes_df['Name'].str.contains(recipe_name, case=False, na=False)]
-        
-        if match.empty:
+        return _nutritional_info(recipe_name)
+    except Exception:
+        log.exception("Error in get_nutritional_info_tool for '%s'", recipe_name)
+        return f"Sorry, an error occurred while fetching nutritional information for '{recipe_name}'."
+
+
+@lru_cache(maxsize=1024)
+def _nutritional_info(recipe_name: str) -> str:
+    if 'Name' not in recipes_df.columns:
+        return "Information unavailable: 'Name' column missing."
+
+    # Exact full-name hit is a dict lookup; otherwise fall back to one C-level
+    # substring scan over the lowercased name array (first match wins, as
+    # before).
+    needle = recipe_name.lower()
+    row_id = _name_exact.get(needle)
+    if row_id is None:
+        if _name_arrow is not None:
+            hits = np.flatnonzero(_contains_string(_name_arrow, needle))
+        else:
+            hits = np.flatnonzero(
+                recipes_df['Name'].str.contains(needle, case=False, na=False, regex=False).to_numpy()
+            )
+        if hits.size == 0:
             return f"Sorry, I couldn't find a recipe named '{recipe_name}' to get nutritional info."
-        
-        recipe_data = match.iloc[0]
-        output_parts = [f"Nutritional information for '{recipe_data.get('Name', recipe_name)}':"]
-        
-        nutritional_columns = ['Calories', 'SodiumContent', 'FatContent', 'ProteinContent', 'CarbohydrateContent']
-        for col in nutritional_columns:
-            if col in recipe_data and pd.notna(recipe_data[col]):
-                unit = " mg" if col == "SodiumContent" else ""
-                output_parts.append(f"* {col.replace('Content', '')}: {recipe_data[col]}{unit}")
-        
-        if len(output_parts) == 1: 
-            return f"No specific nutritional details found for '{recipe_data.get('Name', recipe_name)}', though the recipe exists."
+        row_id = int(hits[0])
 
-        return "\n".join(output_parts)
-        
-    except Exception as e:
-        print(f"Error in get_nutritional_info_tool for '{recipe_name}': {e}")
-        traceback.print_exc() # Add traceback for debugging
-        return f"Sorry, an error occurred while fetching nutritional information for '{recipe_name}'."
\ No newline at end of file
+    recipe_data = recipes_df.iloc[row_id]
+    output_parts = [f"Nutritional information for '{recipe_data.get('Name', recipe_name)}':"]
+
+    nutritional_columns = ['Calories', 'SodiumContent', 'FatContent', 'ProteinContent', 'CarbohydrateContent']
+    for col in nutritional_columns:
+        if col in recipe_data and pd.notna(recipe_data[col]):
+            unit = " mg" if col == "SodiumContent" else ""
+            output_parts.append(f"* {col.replace('Content', '')}: {recipe_data[col]}{unit}")
+
+    if len(output_parts) == 1:
+        return f"No specific nutritional details found for '{recipe_data.get('Name', recipe_name)}', though the recipe exists."
+
+    return "\n".join(output_parts)
\ No newline at end of file
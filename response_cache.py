@@ -0,0 +1,85 @@
+import hashlib
+
+from cachetools import TTLCache
+
+# The semantic tier needs sentence-transformers + faiss, which are heavyweight
+# and not part of the base image. The cache degrades to exact-match only when
+# they are not installed.
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    _SEMANTIC_AVAILABLE = True
+except ImportError:
+    _SEMANTIC_AVAILABLE = False
+
+# Exact tier: identical (normalized) questions within the TTL window.
+EXACT_CACHE_MAXSIZE = 10_000
+EXACT_CACHE_TTL_SECONDS = 3600
+
+# Semantic tier: near-identical questions by embedding cosine similarity.
+SEMANTIC_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+
+
+def _normalize_question(question: str) -> str:
+    """Collapses whitespace and case so trivially different phrasings collide."""
+    return " ".join(question.lower().split())
+
+
+class ResponseCache:
+    """
+    Two-tier cache for chatbot answers, sitting in front of the Gemini calls.
+
+    Tier 1 is an exact-match TTLCache keyed by a digest of the normalized
+    question plus a namespace (model name + tool schema), so a model or tool
+    change invalidates old answers. Tier 2, when its optional dependencies are
+    installed, embeds the question and returns the stored answer of the most
+    similar past question when cosine similarity clears the threshold.
+    """
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        self._exact = TTLCache(maxsize=EXACT_CACHE_MAXSIZE, ttl=EXACT_CACHE_TTL_SECONDS)
+        self._embedder = None
+        self._index = None
+        self._answers: list[str] = []
+        if _SEMANTIC_AVAILABLE:
+            try:
+                self._embedder = SentenceTransformer(SEMANTIC_MODEL_NAME)
+                self._index = faiss.IndexFlatIP(
+                    self._embedder.get_sentence_embedding_dimension()
+                )
+                print(f"Semantic response cache enabled ({SEMANTIC_MODEL_NAME}).")
+            except Exception as e:
+                print(f"Semantic response cache disabled (failed to initialize): {e}")
+                self._embedder = None
+                self._index = None
+
+    def _key(self, question: str) -> bytes:
+        payload = f"{self.namespace}\x00{_normalize_question(question)}"
+        return hashlib.blake2b(payload.encode("utf-8")).digest()
+
+    def _embed(self, question: str):
+        vector = self._embedder.encode([_normalize_question(question)])
+        vector = np.asarray(vector, dtype="float32")
+        faiss.normalize_L2(vector)  # normalized vectors make inner product == cosine
+        return vector
+
+    def get(self, question: str) -> str | None:
+        answer = self._exact.get(self._key(question))
+        if answer is not None:
+            return answer
+
+        if self._index is not None and self._index.ntotal > 0:
+            vector = self._embed(question)
+            similarities, ids = self._index.search(vector, 1)
+            if similarities[0][0] >= SEMANTIC_SIMILARITY_THRESHOLD:
+                return self._answers[ids[0][0]]
+        return None
+
+    def put(self, question: str, answer: str):
+        self._exact[self._key(question)] = answer
+        if self._index is not None:
+            self._index.add(self._embed(question))
+            self._answers.append(answer)
@@ -0,0 +1,68 @@
+# scripts/check_metadata.py
+#
+# Debugging helper for GCE/Cloud Run metadata-server issues. Run it manually
+# when the auth library misbehaves; it is never imported by the application.
+import json
+import logging
+
+import requests
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+log = logging.getLogger(__name__)
+
+METADATA_SA_INFO_URL = (
+    "http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/?recursive=true"
+)
+METADATA_PROJECT_ID_URL = "http://metadata.google.internal/computeMetadata/v1/project/project-id"
+
+
+def main():
+    with requests.Session() as session:
+        session.headers.update({"Metadata-Flavor": "Google"})
+
+        log.info("Attempting to query metadata server for default service account info...")
+        try:
+            response = session.get(METADATA_SA_INFO_URL, timeout=10)
+            log.info(
+                "Status Code: %s\nResponse Headers: %s\nResponse Text (first 500 chars): %s",
+                response.status_code, response.headers, response.text[:500],
+            )
+
+            if response.ok:
+                try:
+                    info_json = response.json()
+                    log.info("Successfully parsed response as JSON.")
+                    if "email" in info_json:
+                        log.info("Service Account Email from metadata: %s", info_json["email"])
+                    else:
+                        log.warning(
+                            "'email' key NOT found in JSON response. Full JSON:\n%s",
+                            json.dumps(info_json, indent=2),
+                        )
+                except json.JSONDecodeError:
+                    log.error(
+                        "Response was NOT valid JSON. This is why the auth library is failing."
+                    )
+            else:
+                log.error("Metadata server returned a non-OK status code.")
+
+        except requests.exceptions.Timeout:
+            log.error(
+                "Request to metadata server timed out. Check network or if metadata server is responsive."
+            )
+        except requests.exceptions.RequestException as e:
+            log.error("An error occurred while contacting the metadata server: %s", e)
+
+        log.info("Attempting to query metadata server for project ID...")
+        try:
+            response_project = session.get(METADATA_PROJECT_ID_URL, timeout=5)
+            log.info(
+                "Project ID Status Code: %s\nProject ID Response Text: %s",
+                response_project.status_code, response_project.text,
+            )
+        except Exception as e:
+            log.error("Error fetching project ID: %s", e)
+
+
+if __name__ == "__main__":
+    main()